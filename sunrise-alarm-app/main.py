@@ -22,6 +22,11 @@ from datetime import datetime, timedelta
 import json
 import os
 
+from sunrise import sunrise_color_at, sunrise_table
+
+# Seconds between alarm checks, which also bounds how far ahead they look
+ALARM_CHECK_INTERVAL = 30
+
 
 class SunriseScreen(Screen):
     """Screen that displays the sunrise animation"""
@@ -66,6 +71,10 @@ class SunriseScreen(Screen):
         self.sunrise_progress = 0
         self.sunrise_event = None
 
+        # Precomputed by prepare_sunrise
+        self.sunrise_colors = []
+        self.sunrise_total_seconds = None
+
         # Update time every second
         Clock.schedule_interval(self.update_time, 1)
 
@@ -78,13 +87,41 @@ class SunriseScreen(Screen):
         current_time = datetime.now().strftime('%I:%M %p')
         self.time_label.text = current_time
 
+    def prepare_sunrise(self, duration_minutes=30):
+        """Warm up ahead of an alarm so the sunrise starts without a hitch"""
+        if self.sunrise_active:
+            return
+
+        total_seconds = duration_minutes * 60
+        if self.sunrise_total_seconds != total_seconds:
+            self.sunrise_colors = sunrise_table(total_seconds)
+            self.sunrise_total_seconds = total_seconds
+
+        # Make sure the background starts from night
+        Animation.cancel_all(self.bg_color)
+        self.bg_color.rgb = self.sunrise_colors[0]
+
+    def show_warmup(self):
+        """Show the clock and a way to skip the alarm while waiting for it"""
+        self.stop_button.text = 'Skip Alarm'
+
+        anim = Animation(color=(1, 1, 1, 1), duration=2)
+        anim.start(self.time_label)
+
+        btn_anim = Animation(opacity=1, duration=2)
+        btn_anim.start(self.stop_button)
+
     def start_sunrise(self, duration_minutes=30):
         """Start the sunrise simulation"""
         if self.sunrise_active:
             return
 
+        # Cheap when the alarm was warmed up, the color table is reused
+        self.prepare_sunrise(duration_minutes)
+
         self.sunrise_active = True
         self.sunrise_progress = 0
+        self.stop_button.text = 'Stop Alarm'
 
         # Show time label and stop button with fade in
         anim = Animation(color=(1, 1, 1, 1), duration=2)
@@ -93,10 +130,9 @@ class SunriseScreen(Screen):
         btn_anim = Animation(opacity=1, duration=2)
         btn_anim.start(self.stop_button)
 
-        # Schedule sunrise progression
-        # Update every second for smooth transition
+        # Night is showing from prepare_sunrise, update every second for smooth transition
         self.sunrise_event = Clock.schedule_interval(
-            lambda dt: self.update_sunrise(duration_minutes * 60),
+            lambda dt: self.update_sunrise(self.sunrise_total_seconds),
             1
         )
 
@@ -105,37 +141,7 @@ class SunriseScreen(Screen):
         self.sunrise_progress += 1
         progress = min(self.sunrise_progress / total_seconds, 1.0)
 
-        # Sunrise color phases:
-        # 1. Deep purple/blue (night) -> 0-20%
-        # 2. Purple/orange (dawn) -> 20-40%
-        # 3. Orange/red (sunrise) -> 40-70%
-        # 4. Yellow/bright (morning) -> 70-100%
-
-        if progress <= 0.2:
-            # Deep purple to lighter purple
-            r = progress / 0.2 * 0.2
-            g = 0
-            b = 0.1 + (progress / 0.2 * 0.3)
-        elif progress <= 0.4:
-            # Purple to orange
-            local_progress = (progress - 0.2) / 0.2
-            r = 0.2 + (local_progress * 0.6)
-            g = local_progress * 0.2
-            b = 0.4 - (local_progress * 0.3)
-        elif progress <= 0.7:
-            # Orange to red/yellow
-            local_progress = (progress - 0.4) / 0.3
-            r = 0.8 + (local_progress * 0.2)
-            g = 0.2 + (local_progress * 0.5)
-            b = 0.1
-        else:
-            # Yellow to bright daylight
-            local_progress = (progress - 0.7) / 0.3
-            r = 1.0
-            g = 0.7 + (local_progress * 0.3)
-            b = 0.1 + (local_progress * 0.7)
-
-        self.bg_color.rgb = (r, g, b)
+        self.bg_color.rgb = sunrise_color_at(self.sunrise_colors, self.sunrise_progress)
 
         if progress >= 1.0:
             # Sunrise complete
@@ -144,7 +150,10 @@ class SunriseScreen(Screen):
                 self.sunrise_event = None
 
     def stop_alarm(self, instance):
-        """Stop the sunrise alarm"""
+        """Stop the sunrise alarm, or skip it while warming up"""
+        if not self.sunrise_active:
+            self.manager.get_screen('main').skip_pending_alarms()
+
         if self.sunrise_event:
             self.sunrise_event.cancel()
             self.sunrise_event = None
@@ -171,34 +180,26 @@ class SunriseScreen(Screen):
 class AlarmItem(BoxLayout):
     """Widget for displaying a single alarm"""
 
-    def __init__(self, alarm_data, delete_callback, **kwargs):
+    def __init__(self, alarm_data, delete_callback, toggle_callback=None, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'horizontal'
         self.size_hint_y = None
         self.height = 80
         self.spacing = 10
         self.padding = 10
-        self.alarm_data = alarm_data
+        self.toggle_callback = toggle_callback
 
         # Alarm info
         info_layout = BoxLayout(orientation='vertical', size_hint_x=0.6)
 
-        time_text = f"{alarm_data['hour']:02d}:{alarm_data['minute']:02d}"
         self.time_label = Label(
-            text=time_text,
             font_size='24sp',
             size_hint_y=0.6,
             halign='left'
         )
         self.time_label.bind(size=self.time_label.setter('text_size'))
 
-        # Days of week
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        active_days = [days[i] for i, active in enumerate(alarm_data['days']) if active]
-        days_text = ', '.join(active_days) if active_days else 'One time'
-
         self.days_label = Label(
-            text=days_text,
             font_size='14sp',
             size_hint_y=0.4,
             halign='left',
@@ -210,11 +211,7 @@ class AlarmItem(BoxLayout):
         info_layout.add_widget(self.days_label)
 
         # Enable toggle
-        self.toggle = ToggleButton(
-            text='ON' if alarm_data['enabled'] else 'OFF',
-            state='down' if alarm_data['enabled'] else 'normal',
-            size_hint_x=0.2
-        )
+        self.toggle = ToggleButton(size_hint_x=0.2)
         self.toggle.bind(on_press=self.toggle_alarm)
 
         # Delete button
@@ -229,10 +226,27 @@ class AlarmItem(BoxLayout):
         self.add_widget(self.toggle)
         self.add_widget(delete_btn)
 
+        self.set_alarm(alarm_data)
+
+    def set_alarm(self, alarm_data):
+        """Show the given alarm, so rows can be reused when the list changes"""
+        self.alarm_data = alarm_data
+        self.time_label.text = f"{alarm_data['hour']:02d}:{alarm_data['minute']:02d}"
+
+        # Days of week
+        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        active_days = [days[i] for i, active in enumerate(alarm_data['days']) if active]
+        self.days_label.text = ', '.join(active_days) if active_days else 'One time'
+
+        self.toggle.text = 'ON' if alarm_data['enabled'] else 'OFF'
+        self.toggle.state = 'down' if alarm_data['enabled'] else 'normal'
+
     def toggle_alarm(self, instance):
         """Toggle alarm on/off"""
         self.alarm_data['enabled'] = instance.state == 'down'
         instance.text = 'ON' if self.alarm_data['enabled'] else 'OFF'
+        if self.toggle_callback:
+            self.toggle_callback(self.alarm_data)
 
 
 class MainScreen(Screen):
@@ -261,6 +275,8 @@ class MainScreen(Screen):
         Clock.schedule_interval(self.update_current_time, 1)
 
         # Alarms list
+        self.alarm_items = []
+        self.no_alarms_label = None
         self.alarms_layout = BoxLayout(orientation='vertical', size_hint_y=0.55)
         self.alarms_scroll = self.create_alarms_list()
         self.alarms_layout.add_widget(self.alarms_scroll)
@@ -298,7 +314,10 @@ class MainScreen(Screen):
         self.add_widget(self.layout)
 
         # Schedule alarm checking
-        Clock.schedule_interval(self.check_alarms, 30)  # Check every 30 seconds
+        # (id(alarm), fire time) -> warm-up and fire events, for alarms
+        # already warmed up or triggered
+        self.scheduled_alarms = {}
+        Clock.schedule_interval(self.check_alarms, ALARM_CHECK_INTERVAL)
 
     def update_current_time(self, dt):
         """Update current time display"""
@@ -326,26 +345,40 @@ class MainScreen(Screen):
         self.alarms_container.clear_widgets()
         app = App.get_running_app()
 
+        # Widgets are reused rather than rebuilt: every discarded Label
+        # leaves its 'sp' font size callbacks behind in Kivy
         if not app.alarms:
-            no_alarms = Label(
-                text='No alarms set\nTap "Add Alarm" to create one',
-                size_hint_y=None,
-                height=100,
-                color=(0.6, 0.6, 0.6, 1)
-            )
-            self.alarms_container.add_widget(no_alarms)
+            if self.no_alarms_label is None:
+                self.no_alarms_label = Label(
+                    text='No alarms set\nTap "Add Alarm" to create one',
+                    size_hint_y=None,
+                    height=100,
+                    color=(0.6, 0.6, 0.6, 1)
+                )
+            self.alarms_container.add_widget(self.no_alarms_label)
         else:
-            for alarm in app.alarms:
-                alarm_widget = AlarmItem(alarm, self.delete_alarm)
+            for index, alarm in enumerate(app.alarms):
+                if index < len(self.alarm_items):
+                    alarm_widget = self.alarm_items[index]
+                    alarm_widget.set_alarm(alarm)
+                else:
+                    alarm_widget = AlarmItem(alarm, self.delete_alarm, self.alarm_toggled)
+                    self.alarm_items.append(alarm_widget)
                 self.alarms_container.add_widget(alarm_widget)
 
     def delete_alarm(self, alarm_data):
         """Delete an alarm"""
         app = App.get_running_app()
+        self.cancel_scheduled_alarm(alarm_data)
         app.alarms.remove(alarm_data)
         app.save_alarms()
         self.refresh_alarms_list()
 
+    def alarm_toggled(self, alarm_data):
+        """Drop any pending warm-up when an alarm is turned off"""
+        if not alarm_data['enabled']:
+            self.cancel_scheduled_alarm(alarm_data)
+
     def go_to_add_alarm(self, instance):
         """Navigate to add alarm screen"""
         self.manager.current = 'add_alarm'
@@ -361,23 +394,89 @@ class MainScreen(Screen):
         self.manager.current = 'sunrise'
 
     def check_alarms(self, dt):
-        """Check if any alarms should trigger"""
+        """Check if any alarms should warm up or trigger"""
         app = App.get_running_app()
         now = datetime.now()
-        current_day = now.weekday()  # 0 = Monday, 6 = Sunday
-        current_time = now.strftime('%H:%M')
+
+        # Forget fire times that have passed
+        for key in list(self.scheduled_alarms):
+            if key[1] < now - timedelta(minutes=1):
+                del self.scheduled_alarms[key]
 
         for alarm in app.alarms:
             if not alarm['enabled']:
                 continue
 
-            alarm_time = f"{alarm['hour']:02d}:{alarm['minute']:02d}"
+            fire_time = self.next_fire_time(alarm, now)
+            key = (id(alarm), fire_time)
+            if fire_time is None or key in self.scheduled_alarms:
+                continue
 
-            # Check if time matches (within 1 minute window)
-            if alarm_time == current_time:
-                # Check if this day is enabled
-                if alarm['days'][current_day]:
-                    self.trigger_alarm(alarm)
+            seconds_left = (fire_time - now).total_seconds()
+            if seconds_left <= 0:
+                # Missed the warm-up (e.g. alarm added this minute), fire now
+                self.scheduled_alarms[key] = ()
+                self.trigger_alarm(alarm)
+            elif seconds_left <= app.warmup_seconds + ALARM_CHECK_INTERVAL:
+                # Before the next check, warm up and fire on the exact second
+                warmup_delay = max(seconds_left - app.warmup_seconds, 0)
+                self.scheduled_alarms[key] = (
+                    Clock.schedule_once(lambda dt, a=alarm: self.warm_up_alarm(a), warmup_delay),
+                    Clock.schedule_once(lambda dt, a=alarm: self.fire_alarm(a), seconds_left)
+                )
+
+    def cancel_scheduled_alarm(self, alarm):
+        """Cancel the pending warm-up and fire events of an alarm"""
+        for key in list(self.scheduled_alarms):
+            if key[0] == id(alarm):
+                for event in self.scheduled_alarms.pop(key):
+                    event.cancel()
+
+    def skip_pending_alarms(self):
+        """Cancel every warmed-up alarm that hasn't fired yet"""
+        now = datetime.now()
+        for key, events in self.scheduled_alarms.items():
+            if key[1] > now:
+                for event in events:
+                    event.cancel()
+                # Keep the key so check_alarms doesn't schedule it again
+                self.scheduled_alarms[key] = ()
+
+    def is_alarm_due(self, alarm):
+        """Check the alarm still exists and is enabled"""
+        app = App.get_running_app()
+        return alarm['enabled'] and any(a is alarm for a in app.alarms)
+
+    def next_fire_time(self, alarm, now):
+        """Return when the alarm fires next, counting the current minute"""
+        this_minute = now.replace(second=0, microsecond=0)
+        for days_ahead in (0, 1):
+            fire_time = this_minute.replace(hour=alarm['hour'], minute=alarm['minute'])
+            fire_time += timedelta(days=days_ahead)
+            if fire_time >= this_minute and alarm['days'][fire_time.weekday()]:
+                return fire_time
+        return None
+
+    def warm_up_alarm(self, alarm):
+        """Prepare the sunrise screen ahead of an alarm"""
+        app = App.get_running_app()
+        sunrise_screen = self.manager.get_screen('sunrise')
+        if sunrise_screen.sunrise_active or not self.is_alarm_due(alarm):
+            return
+
+        sunrise_screen.prepare_sunrise(duration_minutes=app.sunrise_duration)
+        sunrise_screen.show_warmup()
+
+        # Switch now so the transition and first frame are done before the alarm
+        self.manager.current = 'sunrise'
+
+    def fire_alarm(self, alarm):
+        """Trigger a warmed-up alarm, unless it was disabled or deleted meanwhile"""
+        if self.is_alarm_due(alarm):
+            self.trigger_alarm(alarm)
+        elif (self.manager.current == 'sunrise'
+                and not self.manager.get_screen('sunrise').sunrise_active):
+            self.manager.current = 'main'
 
     def trigger_alarm(self, alarm):
         """Trigger the sunrise alarm"""
@@ -648,6 +747,7 @@ class SunriseAlarmApp(App):
         super().__init__(**kwargs)
         self.alarms = []
         self.sunrise_duration = 30  # Default 30 minutes
+        self.warmup_seconds = 60  # Prepare the sunrise a minute early
         self.keep_screen_on = True
         self.data_dir = None
 
@@ -700,6 +800,7 @@ class SunriseAlarmApp(App):
         try:
             settings = {
                 'sunrise_duration': self.sunrise_duration,
+                'warmup_seconds': self.warmup_seconds,
                 'keep_screen_on': self.keep_screen_on
             }
             with open(self.get_data_path('settings.json'), 'w') as f:
@@ -707,6 +808,13 @@ class SunriseAlarmApp(App):
         except Exception as e:
             print(f"Error saving settings: {e}")
 
+    def parse_warmup_seconds(self, value):
+        """Clamp the warm-up read from settings.json to a whole number of seconds"""
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return 60
+
     def load_settings(self):
         """Load settings from file"""
         try:
@@ -715,6 +823,8 @@ class SunriseAlarmApp(App):
                 with open(settings_file, 'r') as f:
                     settings = json.load(f)
                     self.sunrise_duration = settings.get('sunrise_duration', 30)
+                    self.warmup_seconds = self.parse_warmup_seconds(
+                        settings.get('warmup_seconds', 60))
                     self.keep_screen_on = settings.get('keep_screen_on', True)
         except Exception as e:
             print(f"Error loading settings: {e}")
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Offline sunrise renderer
+Renders the sunrise for any duration and curve to PNG frames, an animated
+PNG or a raw RGB video stream without needing a display, and checks both
+the curve and the running app against the golden snapshots in golden/
+"""
+
+import argparse
+import importlib
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from sunrise import sunrise_color_at, sunrise_table
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+# The test sunrise, plus both ends and the default of the duration slider
+GOLDEN_DURATIONS = (0.5, 10, 30, 60)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+DEFAULT_OUTPUTS = {'png': 'sunrise_frames', 'apng': 'sunrise.png', 'raw': 'sunrise.rgb'}
+
+
+def load_curve(spec):
+    """Import a curve given as 'module:function'"""
+    module_name, _, function_name = spec.partition(':')
+    if not module_name or not function_name:
+        raise ValueError(f"Curve must look like 'module:function', got {spec!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def rgb_bytes(rgb):
+    """Convert an (r, g, b) color in 0-1 to three bytes"""
+    return bytes(min(max(int(round(c * 255)), 0), 255) for c in rgb)
+
+
+class FrameRenderer:
+    """Fills RGB frames with the sunrise color shown at each frame's time"""
+
+    def __init__(self, duration_minutes, fps=1, width=64, height=48,
+                 curve='sunrise:sunrise_color'):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.total_seconds = duration_minutes * 60
+        self.colors = sunrise_table(self.total_seconds, load_curve(curve))
+
+        # Up to and including the first frame of full daylight
+        self.frame_count = (len(self.colors) - 1) * fps + 1
+        self.frame_bytes = width * height * 3
+
+        # Compressed image data per pixel color, see encode_frames
+        self._encoded = {}
+
+    def frame_pixel(self, frame):
+        """Return the RGB bytes of one pixel of the given frame"""
+        return rgb_bytes(sunrise_color_at(self.colors, frame / self.fps))
+
+    def render_into(self, buffer, offset, start, count):
+        """Render `count` frames starting at `start` into `buffer` at `offset`"""
+        pixels = self.width * self.height
+        for i in range(count):
+            position = offset + i * self.frame_bytes
+            buffer[position:position + self.frame_bytes] = self.frame_pixel(start + i) * pixels
+
+    def encode_frames(self, start, count):
+        """Return the compressed PNG image data of `count` frames from `start`
+
+        Frames are a solid color that changes at most once a second, so each
+        color is compressed once and reused for the frames that repeat it.
+        """
+        payloads = []
+        for frame in range(start, start + count):
+            pixel = self.frame_pixel(frame)
+            if pixel not in self._encoded:
+                self._encoded[pixel] = compress_rgb(
+                    self.width, self.height, pixel * (self.width * self.height))
+            payloads.append(self._encoded[pixel])
+        return payloads
+
+
+# Per-process state for pool workers, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(renderer, shm_name=None):
+    """Give a pool worker the renderer, and attach it to the shared output buffer"""
+    _worker['renderer'] = renderer
+    if shm_name:
+        _worker['shm'] = shared_memory.SharedMemory(name=shm_name)
+
+
+def _render_chunk(offset, start, count):
+    """Render a chunk of frames into the shared output buffer"""
+    _worker['renderer'].render_into(_worker['shm'].buf, offset, start, count)
+
+
+def _encode_chunk(start, count):
+    """Encode a chunk of frames and return their compressed image data"""
+    return _worker['renderer'].encode_frames(start, count)
+
+
+def render_frames(renderer, workers=None, batch_frames=256):
+    """Yield every frame in order as raw RGB bytes
+
+    Frames are rendered in batches. Each batch is split into chunks that
+    pool workers render in parallel straight into a shared memory buffer.
+    """
+    if workers == 1:
+        buffer = bytearray(renderer.frame_bytes)
+        for frame in range(renderer.frame_count):
+            renderer.render_into(buffer, 0, frame, 1)
+            yield bytes(buffer)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    batch_frames = min(batch_frames, renderer.frame_count)
+    chunk_frames = max(batch_frames // workers, 1)
+    frame_bytes = renderer.frame_bytes
+
+    shm = shared_memory.SharedMemory(create=True, size=frame_bytes * batch_frames)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(renderer, shm.name)) as pool:
+            for batch_start in range(0, renderer.frame_count, batch_frames):
+                count = min(batch_frames, renderer.frame_count - batch_start)
+                futures = [
+                    pool.submit(_render_chunk, i * frame_bytes, batch_start + i,
+                                min(chunk_frames, count - i))
+                    for i in range(0, count, chunk_frames)
+                ]
+                for future in futures:
+                    future.result()
+
+                for i in range(count):
+                    yield bytes(shm.buf[i * frame_bytes:(i + 1) * frame_bytes])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def encode_frames(renderer, workers=None, chunk_frames=64):
+    """Yield the compressed PNG image data of every frame in order
+
+    Compression is the expensive step, so pool workers each encode a chunk
+    of frames and the parent only writes the results out in order.
+    """
+    starts = range(0, renderer.frame_count, chunk_frames)
+    counts = [min(chunk_frames, renderer.frame_count - start) for start in starts]
+
+    if workers == 1:
+        for start, count in zip(starts, counts):
+            yield from renderer.encode_frames(start, count)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(renderer,)) as pool:
+        for payloads in pool.map(_encode_chunk, starts, counts):
+            yield from payloads
+
+
+def png_chunk(kind, data):
+    """Encode a single PNG chunk"""
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def png_header(width, height):
+    """Encode the IHDR chunk for an 8-bit RGB image"""
+    return png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+
+def compress_rgb(width, height, data):
+    """Compress RGB rows for IDAT, with no filtering"""
+    stride = width * 3
+    rows = b''.join(b'\x00' + data[y * stride:(y + 1) * stride] for y in range(height))
+    return zlib.compress(rows, 9)
+
+
+def write_png(path, width, height, data):
+    """Write raw RGB bytes as a PNG file"""
+    write_png_data(path, width, height, compress_rgb(width, height, data))
+
+
+def write_png_data(path, width, height, compressed):
+    """Write already compressed image data as a PNG file"""
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_header(width, height))
+        f.write(png_chunk(b'IDAT', compressed))
+        f.write(png_chunk(b'IEND', b''))
+
+
+def read_png(path):
+    """Read a PNG written by write_png and return (width, height, rgb bytes)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(f'{path} is not a PNG file')
+
+    position = len(PNG_SIGNATURE)
+    idat = []
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        position += length + 12
+        if kind == b'IHDR':
+            width, height, depth, color_type = struct.unpack('>IIBB', body[:10])
+            if (depth, color_type) != (8, 2):
+                raise ValueError(f'{path} is not an 8-bit RGB PNG')
+        elif kind == b'IDAT':
+            idat.append(body)
+
+    raw = zlib.decompress(b''.join(idat))
+    stride = width * 3 + 1
+    rows = []
+    for y in range(height):
+        row = raw[y * stride:(y + 1) * stride]
+        if row[0] != 0:
+            raise ValueError(f'{path} uses PNG filters, which are not supported')
+        rows.append(row[1:])
+    return width, height, b''.join(rows)
+
+
+def write_apng(path, renderer, payloads):
+    """Write compressed frames as an animated PNG playing at the renderer's frame rate"""
+    width, height = renderer.width, renderer.height
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_header(width, height))
+        f.write(png_chunk(b'acTL', struct.pack('>II', renderer.frame_count, 0)))
+
+        sequence = 0
+        for index, compressed in enumerate(payloads):
+            f.write(png_chunk(b'fcTL', struct.pack(
+                '>IIIIIHHBB', sequence, width, height, 0, 0, 1, renderer.fps, 0, 0)))
+            sequence += 1
+
+            if index == 0:
+                f.write(png_chunk(b'IDAT', compressed))
+            else:
+                f.write(png_chunk(b'fdAT', struct.pack('>I', sequence) + compressed))
+                sequence += 1
+
+        f.write(png_chunk(b'IEND', b''))
+
+
+def write_png_frames(directory, renderer, payloads):
+    """Write each compressed frame as a numbered PNG file"""
+    os.makedirs(directory, exist_ok=True)
+    for index, compressed in enumerate(payloads):
+        write_png_data(os.path.join(directory, f'frame_{index:06d}.png'),
+                       renderer.width, renderer.height, compressed)
+
+
+def write_raw(path, frames):
+    """Write frames back to back as a raw rgb24 stream, '-' for stdout"""
+    if path == '-':
+        stream = sys.stdout.buffer
+        for frame in frames:
+            stream.write(frame)
+        stream.flush()
+        return
+
+    with open(path, 'wb') as f:
+        for frame in frames:
+            f.write(frame)
+
+
+def golden_path(duration_minutes):
+    """Path of the golden snapshot for a sunrise duration"""
+    return os.path.join(GOLDEN_DIR, f'sunrise_{int(duration_minutes * 60)}s.png')
+
+
+def render_golden(duration_minutes):
+    """Render a golden snapshot: one pixel per second of the app's sunrise"""
+    renderer = FrameRenderer(duration_minutes, fps=1, width=1, height=1)
+    strip = b''.join(render_frames(renderer, workers=1))
+    return renderer.frame_count, strip
+
+
+def update_golden():
+    """Re-render the golden snapshots"""
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for duration in GOLDEN_DURATIONS:
+        width, strip = render_golden(duration)
+        write_png(golden_path(duration), width, 1, strip)
+        print(f'Wrote {golden_path(duration)}')
+
+
+def compare_strip(path, label, width, strip, tolerance=1):
+    """Compare a strip against a golden snapshot, return True if they match"""
+    golden_width, _, golden = read_png(path)
+    if golden_width != width:
+        print(f'{path} ({label}): expected {golden_width} seconds, got {width}')
+        return False
+
+    for second in range(width):
+        expected = golden[second * 3:second * 3 + 3]
+        actual = strip[second * 3:second * 3 + 3]
+        if any(abs(a - e) > tolerance for a, e in zip(actual, expected)):
+            print(f'{path} ({label}): first difference at {second}s, '
+                  f'expected {tuple(expected)}, got {tuple(actual)}')
+            return False
+
+    print(f'{path} ({label}): ok')
+    return True
+
+
+def record_app_sunrise(harness, duration_minutes):
+    """Play a sunrise in the app and record its color every second
+
+    The first color is read right after start_sunrise, since it must show
+    at once. The rest are read halfway through each second, so they don't
+    depend on the order of events within a clock tick.
+    """
+    sunrise_screen = harness.sunrise_screen
+    sunrise_screen.start_sunrise(duration_minutes=duration_minutes)
+    width = len(sunrise_table(duration_minutes * 60))
+
+    strip = [rgb_bytes(sunrise_screen.bg_color.rgb)]
+    harness.clock.advance(1.5, step=0.5)
+    for second in range(1, width):
+        strip.append(rgb_bytes(sunrise_screen.bg_color.rgb))
+        harness.clock.advance(1, step=0.5)
+
+    sunrise_screen.stop_alarm(None)
+    harness.settle()
+    return width, b''.join(strip)
+
+
+def check_golden(app=True):
+    """Compare the curve and the running app against the golden snapshots
+
+    The app check drives SunriseScreen.start_sunrise and update_sunrise
+    under soak.py's simulated clock, so it needs Kivy and a display.
+    Returns True if everything matches.
+    """
+    ok = True
+    for duration in GOLDEN_DURATIONS:
+        width, strip = render_golden(duration)
+        ok = compare_strip(golden_path(duration), 'curve', width, strip) and ok
+
+    if not app:
+        return ok
+
+    # Imported here so pool workers never load Kivy
+    import soak
+
+    harness = soak.SoakHarness(soak.parse_args([]))
+    try:
+        harness.settle()
+        for duration in GOLDEN_DURATIONS:
+            width, strip = record_app_sunrise(harness, duration)
+            ok = compare_strip(golden_path(duration), 'app', width, strip) and ok
+    finally:
+        harness.close()
+
+    return ok
+
+
+def parse_size(value):
+    """Parse a WIDTHxHEIGHT frame size"""
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Size must look like 64x48, got {value!r}')
+    return width, height
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=30,
+                        help='sunrise duration in minutes (default: 30)')
+    parser.add_argument('--curve', default=None,
+                        help="color curve as 'module:function' (default: sunrise:sunrise_color, "
+                             "the app's curve)")
+    parser.add_argument('--fps', type=int, default=1,
+                        help='frames per second of sunrise time (default: 1)')
+    parser.add_argument('--size', type=parse_size, default=(64, 48),
+                        help='frame size as WIDTHxHEIGHT (default: 64x48)')
+    parser.add_argument('--format', choices=('png', 'apng', 'raw'), default='apng',
+                        help='numbered PNG frames, one animated PNG or a raw rgb24 '
+                             'stream (default: apng)')
+    parser.add_argument('-o', '--output', default=None,
+                        help="output file, directory for png, or '-' for raw on stdout "
+                             "(default: sunrise.png, sunrise_frames/ or sunrise.rgb)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='render processes (default: one per CPU)')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='re-render the golden snapshots and exit')
+    parser.add_argument('--check-golden', action='store_true',
+                        help='compare the curve and the running app against the '
+                             'golden snapshots and exit')
+    parser.add_argument('--curve-only', action='store_true',
+                        help='with --check-golden, skip the app check, which needs '
+                             'Kivy and a display')
+    args = parser.parse_args(argv)
+
+    if args.duration <= 0:
+        parser.error('--duration must be greater than 0')
+    if not 0 < args.fps <= 65535:
+        # The APNG frame delay stores 1/fps with a 16-bit denominator
+        parser.error('--fps must be between 1 and 65535')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if min(args.size) <= 0:
+        parser.error('--size must be at least 1x1')
+    # The golden snapshots are the app's sunrise, which always uses the default curve
+    if args.curve is not None and (args.update_golden or args.check_golden):
+        parser.error('--curve cannot be used with --update-golden or --check-golden')
+    if args.curve is None:
+        args.curve = 'sunrise:sunrise_color'
+    try:
+        load_curve(args.curve)
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(f'--curve: {e}')
+
+    if args.output is None:
+        args.output = DEFAULT_OUTPUTS[args.format]
+    return args
+
+
+def main(argv=None):
+    """Run the renderer from the command line"""
+    args = parse_args(argv)
+
+    if args.update_golden:
+        update_golden()
+        return 0
+    if args.check_golden:
+        return 0 if check_golden(app=not args.curve_only) else 1
+
+    width, height = args.size
+    renderer = FrameRenderer(args.duration, args.fps, width, height, args.curve)
+
+    if args.format == 'png':
+        write_png_frames(args.output, renderer, encode_frames(renderer, args.workers))
+    elif args.format == 'apng':
+        write_apng(args.output, renderer, encode_frames(renderer, args.workers))
+    else:
+        write_raw(args.output, render_frames(renderer, args.workers))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
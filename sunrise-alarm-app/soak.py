@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Soak test harness for the Sunrise Alarm Clock
+Drives the app headlessly through many simulated days and fails if memory
+or the number of live widgets, animations or clock events keeps growing
+"""
+
+import argparse
+import fnmatch
+import gc
+import os
+import re
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Keep Kivy from parsing our arguments, and let the clock run as fast as
+# we feed it simulated time instead of sleeping to honour maxfps
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from kivy.config import Config
+Config.set('graphics', 'maxfps', '0')
+
+from kivy.app import App
+from kivy.clock import Clock, ClockEvent
+from kivy.animation import Animation
+from kivy.core.window import Window
+from kivy.uix.widget import Widget
+
+import main
+
+
+class SimulatedClock:
+    """Replaces the Kivy clock and main.datetime with a controllable time source"""
+
+    def __init__(self, start):
+        self.start = start
+        self.base = Clock.time()
+        self.elapsed = 0.0
+        Clock._max_fps = 0
+        Clock.time = self.time
+        main.datetime = self.make_datetime()
+
+    def make_datetime(self):
+        """Build a datetime class whose now() follows the simulated time"""
+        clock = self
+
+        class SimulatedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.now()
+
+        return SimulatedDatetime
+
+    def time(self):
+        """Monotonic seconds, used by the Kivy clock"""
+        return self.base + self.elapsed
+
+    def now(self):
+        """Simulated wall clock time"""
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def advance(self, seconds, step=1.0):
+        """Advance time by `seconds`, ticking the Kivy clock every `step` seconds"""
+        remaining = seconds
+        while remaining > 0:
+            dt = min(step, remaining)
+            self.elapsed += dt
+            remaining -= dt
+            Clock.tick()
+
+    def jump_to(self, when):
+        """Jump straight to `when` with a single clock tick"""
+        self.elapsed += max((when - self.now()).total_seconds(), 0)
+        Clock.tick()
+
+
+class SoakHarness:
+    """Cycles add, trigger, stop, delete and test sunrise once per simulated day"""
+
+    def __init__(self, args):
+        self.args = args
+        self.data_dir = tempfile.mkdtemp(prefix='sunrise-soak-')
+        self.clock = SimulatedClock(datetime(2024, 1, 1, 22, 0))
+
+        self.app = main.SunriseAlarmApp()
+        self.app.data_dir = self.data_dir
+        App._running_app = self.app
+        self.app.root = self.app.build()
+        self.app.sunrise_duration = args.sunrise_minutes
+
+        self.manager = self.app.root
+        self.main_screen = self.manager.get_screen('main')
+        self.add_screen = self.manager.get_screen('add_alarm')
+        self.sunrise_screen = self.manager.get_screen('sunrise')
+
+        self.samples = []
+        self.baseline = None
+
+    def close(self):
+        """Remove the temporary data directory"""
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def settle(self):
+        """Let screen transitions and fade animations finish"""
+        self.clock.advance(3, step=1 / 30.)
+
+    def add_alarm(self, when):
+        """Add an every-day alarm through the Add Alarm screen"""
+        self.main_screen.go_to_add_alarm(None)
+        self.add_screen.hour_spinner.text = f'{when.hour:02d}'
+        self.add_screen.minute_spinner.text = f'{when.minute:02d}'
+        self.add_screen.set_preset('everyday')
+        self.add_screen.save_alarm(None)
+        self.settle()
+        return self.app.alarms[-1]
+
+    def run_day(self):
+        """Run one simulated night and morning"""
+        now = self.clock.now()
+        wake = (now + timedelta(days=1)).replace(hour=7, minute=0, second=0, microsecond=0)
+        alarm = self.add_alarm(wake)
+
+        # Sleep until shortly before the warm-up, then let check_alarms
+        # warm the sunrise up and fire it
+        self.clock.jump_to(wake - timedelta(seconds=self.app.warmup_seconds + 60))
+        self.clock.advance(self.app.warmup_seconds + 90)
+        if not self.sunrise_screen.sunrise_active:
+            raise RuntimeError(f'Alarm at {wake:%Y-%m-%d %H:%M} did not trigger')
+
+        # Run the full sunrise, then stop it and delete the alarm
+        self.clock.advance(self.app.sunrise_duration * 60)
+        self.sunrise_screen.stop_alarm(None)
+        self.settle()
+        self.main_screen.delete_alarm(alarm)
+        self.settle()
+
+        # Play the 30 second test sunrise and stop it
+        self.main_screen.test_sunrise(None)
+        self.clock.advance(31)
+        self.sunrise_screen.stop_alarm(None)
+        self.settle()
+
+        # Idle through the day until bedtime
+        self.clock.jump_to(wake.replace(hour=22))
+
+    def sample(self, day):
+        """Record memory usage and live object counts"""
+        # Only the baseline snapshot is kept, so older ones don't count as growth
+        for previous in self.samples:
+            if previous is not self.baseline:
+                previous['snapshot'] = None
+
+        # Leave out the harness measuring itself: tracemalloc (including the
+        # baseline snapshot), the fnmatch and re caches its filters fill, and
+        # the samples allocated directly in this file
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+            tracemalloc.Filter(False, fnmatch.__file__, all_frames=True),
+            tracemalloc.Filter(False, os.path.join(os.path.dirname(re.__file__), '*'),
+                               all_frames=True),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<unknown>'),
+        ])
+        # type() rather than isinstance(), which would dereference dead WeakProxy objects
+        objects = gc.get_objects()
+        sample = {
+            'day': day,
+            'memory': sum(stat.size for stat in snapshot.statistics('filename')),
+            'widgets': sum(1 for obj in objects if issubclass(type(obj), Widget)),
+            'animations': sum(1 for obj in objects if issubclass(type(obj), Animation)),
+            'clock_events': sum(1 for obj in objects if issubclass(type(obj), ClockEvent)),
+            'size_observers': len(Window.get_property_observers('size')),
+            'snapshot': snapshot,
+        }
+        del objects
+        self.samples.append(sample)
+        return sample
+
+    def run(self):
+        """Run the soak test and return True if nothing grew past the thresholds"""
+        tracemalloc.start(self.args.frames)
+        self.settle()
+
+        for day in range(1, self.args.days + 1):
+            self.run_day()
+            if day == self.args.warmup_days:
+                self.baseline = self.sample(day)
+                self.print_sample(self.baseline)
+            elif day > self.args.warmup_days and (
+                    day % self.args.sample_every == 0 or day == self.args.days):
+                self.print_sample(self.sample(day))
+
+        if self.baseline is None or self.samples[-1] is self.baseline:
+            print('Not enough days after warm-up to measure growth')
+            return False
+
+        return self.report(self.samples[-1])
+
+    def print_sample(self, sample):
+        """Print a one-line summary of a sample"""
+        print(f"Day {sample['day']:4d}: "
+              f"memory {sample['memory'] / 1024:10.1f} KiB  "
+              f"widgets {sample['widgets']:5d}  "
+              f"animations {sample['animations']:3d}  "
+              f"clock events {sample['clock_events']:4d}  "
+              f"size observers {sample['size_observers']:3d}")
+
+    def report(self, final):
+        """Compare the final sample against the baseline and print the growing sites"""
+        baseline = self.baseline
+        ok = True
+
+        print()
+        print(f"Growth from day {baseline['day']} to day {final['day']}:")
+
+        # Memory is judged per day, so longer runs don't fail on the same leak rate
+        days = final['day'] - baseline['day']
+        memory_growth = (final['memory'] - baseline['memory']) / days
+        memory_limit = self.args.max_memory_kib_per_day * 1024
+        status = 'FAIL' if memory_growth > memory_limit else 'ok'
+        print(f"  {'memory':15s} {memory_growth / 1024:+10.1f} KiB/day "
+              f"(limit {self.args.max_memory_kib_per_day} KiB/day) {status}")
+        ok = ok and memory_growth <= memory_limit
+
+        for key in ('widgets', 'animations', 'clock_events', 'size_observers'):
+            growth = final[key] - baseline[key]
+            status = 'FAIL' if growth > self.args.max_object_growth else 'ok'
+            print(f"  {key:15s} {growth:+10d} "
+                  f"(limit {self.args.max_object_growth}) {status}")
+            ok = ok and growth <= self.args.max_object_growth
+
+        print()
+        print(f'Top {self.args.top} growing allocation sites:')
+        stats = final['snapshot'].compare_to(baseline['snapshot'], 'traceback')
+        growing = [stat for stat in stats if stat.size_diff > 0][:self.args.top]
+        if not growing:
+            print('  (none)')
+        for stat in growing:
+            print(f'  {stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks')
+            for line in stat.traceback.format(limit=self.args.frames):
+                print(f'    {line}')
+
+        print()
+        print('PASSED' if ok else 'FAILED')
+        return ok
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=30,
+                        help='number of simulated days to run (default: 30)')
+    parser.add_argument('--warmup-days', type=int, default=2,
+                        help='days to run before taking the baseline (default: 2)')
+    parser.add_argument('--sample-every', type=int, default=5,
+                        help='take a snapshot every N days (default: 5)')
+    parser.add_argument('--sunrise-minutes', type=int, default=30,
+                        help='sunrise duration used for each alarm (default: 30)')
+    parser.add_argument('--max-memory-kib-per-day', type=float, default=2,
+                        help='allowed traced memory growth per day after the '
+                             'baseline, in KiB (default: 2)')
+    parser.add_argument('--max-object-growth', type=int, default=0,
+                        help='allowed growth in live widgets, animations, '
+                             'clock events and size observers (default: 0)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of growing allocation sites to show (default: 10)')
+    parser.add_argument('--frames', type=int, default=5,
+                        help='traceback depth recorded by tracemalloc (default: 5)')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    harness = SoakHarness(parse_args())
+    try:
+        passed = harness.run()
+    finally:
+        harness.close()
+    sys.exit(0 if passed else 1)
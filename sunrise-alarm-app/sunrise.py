@@ -0,0 +1,61 @@
+"""
+Sunrise color curve
+Kept free of Kivy imports so it can be precomputed ahead of time
+"""
+
+import math
+
+
+def sunrise_color(progress):
+    """Return the (r, g, b) background color for a progress between 0 and 1"""
+    progress = min(max(progress, 0.0), 1.0)
+
+    # Sunrise color phases:
+    # 1. Deep purple/blue (night) -> 0-20%
+    # 2. Purple/orange (dawn) -> 20-40%
+    # 3. Orange/red (sunrise) -> 40-70%
+    # 4. Yellow/bright (morning) -> 70-100%
+
+    if progress <= 0.2:
+        # Deep purple to lighter purple
+        r = progress / 0.2 * 0.2
+        g = 0
+        b = 0.1 + (progress / 0.2 * 0.3)
+    elif progress <= 0.4:
+        # Purple to orange
+        local_progress = (progress - 0.2) / 0.2
+        r = 0.2 + (local_progress * 0.6)
+        g = local_progress * 0.2
+        b = 0.4 - (local_progress * 0.3)
+    elif progress <= 0.7:
+        # Orange to red/yellow
+        local_progress = (progress - 0.4) / 0.3
+        r = 0.8 + (local_progress * 0.2)
+        g = 0.2 + (local_progress * 0.5)
+        b = 0.1
+    else:
+        # Yellow to bright daylight
+        local_progress = (progress - 0.7) / 0.3
+        r = 1.0
+        g = 0.7 + (local_progress * 0.3)
+        b = 0.1 + (local_progress * 0.7)
+
+    return (r, g, b)
+
+
+def sunrise_table(total_seconds, curve=sunrise_color):
+    """Precompute one color per second of a sunrise lasting `total_seconds`
+
+    Entry i is the color shown i seconds in, from night at entry 0 to full
+    daylight at the last entry, after SunriseScreen.update_sunrise's final step.
+    """
+    steps = max(math.ceil(total_seconds), 1)
+    return [curve(min(step / total_seconds, 1.0)) for step in range(steps + 1)]
+
+
+def sunrise_color_at(colors, seconds):
+    """Return the color shown `seconds` after the sunrise started
+
+    The color moves one entry every second and holds the last one at the end.
+    """
+    return colors[min(int(seconds), len(colors) - 1)]